@@ -2,12 +2,16 @@
 import argparse
 import csv
 import json
+import re
 import secrets
+import threading
+import time
 import urllib.parse
-import webbrowser
-from datetime import datetime
-from http.server import BaseHTTPRequestHandler, HTTPServer
-from typing import Any, Dict, List, Optional, Tuple
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+from functools import lru_cache, partial
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import os
 import sys
@@ -20,6 +24,14 @@ if SRC_DIR not in sys.path:
     sys.path.insert(0, SRC_DIR)
 
 import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import AuthBase
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib json module
+    orjson = None
 
 from constants import AUTHORIZATION_URL, ACCESS_TOKEN_URL, API_BASE_URL, REDIRECT_URI, SCOPE
 from secret_store import (
@@ -27,6 +39,8 @@ from secret_store import (
     save_secrets,
     get_client_credentials,
     get_band_tokens,
+    get_band_token_expiry,
+    migrate_secrets,
     save_band_tokens,
     NUM_BANDS,
 )
@@ -36,46 +50,181 @@ DEFAULT_AUTH_URL = AUTHORIZATION_URL
 DEFAULT_TOKEN_URL = ACCESS_TOKEN_URL
 DEFAULT_REDIRECT_URI = REDIRECT_URI
 
+# The redirect URI is static config, so parse and validate it once at import
+_PARSED_REDIRECT = urllib.parse.urlparse(DEFAULT_REDIRECT_URI)
+if _PARSED_REDIRECT.hostname is None or _PARSED_REDIRECT.port is None:
+    raise SystemExit(
+        "REDIRECT_URI must include a hostname and port, e.g. http://localhost:8765/callback"
+    )
+
+# Keep-alive connections kept per host; the compliance check runs up to this many
+# band/endpoint calls at once against the same API host
+HTTP_POOL_SIZE = 32
+
+# Shared HTTP session so every WHOOP call reuses pooled keep-alive connections
+# instead of paying a fresh TCP+TLS handshake per request.
+_SESSION = requests.Session()
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=HTTP_POOL_SIZE,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=(429, 500, 502, 503, 504),
+            # GET only: the token POSTs spend single-use codes and rotating refresh
+            # tokens, so replaying one the server already handled ends in invalid_grant
+            allowed_methods=frozenset(["GET"]),
+            # Hand the final response back so raise_for_status() reports it as before
+            raise_on_status=False,
+        ),
+    ),
+)
+_SESSION.headers["Accept-Encoding"] = "gzip"
+_SESSION.headers["User-Agent"] = f"DIPP-WHOOP-Scripts {requests.utils.default_user_agent()}"
+
+# Collection URLs for each WHOOP data endpoint
+ENDPOINT_URLS: Dict[str, str] = {
+    "sleep": f"{API_BASE_URL}/developer/v2/activity/sleep",
+    "cycle": f"{API_BASE_URL}/developer/v2/cycle",
+    "recovery": f"{API_BASE_URL}/developer/v2/recovery",
+    "workout": f"{API_BASE_URL}/developer/v2/activity/workout",
+}
+
+# Shape of a YYYY-MM-DD date; calendar validity is checked separately
+_YMD = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}")
+
+# Refresh access tokens this many seconds before WHOOP says they expire
+TOKEN_EXPIRY_MARGIN = 60
+
+# Process-wide cache of (access_token, refresh_token, expires_at) keyed by band_id
+_TOKEN_CACHE: Dict[int, Tuple[str, str, float]] = {}
+
+# One lock per band so concurrent callers never rotate the same refresh token twice
+_REFRESH_LOCKS: Dict[int, threading.Lock] = defaultdict(threading.Lock)
+
+# Keeps JSON documents from different bands from interleaving on stdout
+_OUTPUT_LOCK = threading.Lock()
+
+# Upper bound on bands fetched concurrently in --all-bands mode
+MAX_BAND_WORKERS = min(NUM_BANDS, 8)
+
+# Upper bound on concurrent band/endpoint fetches; stays within the session's pool size
+MAX_FETCH_WORKERS = 16
+
+
+def _http_response(status: str, content_type: str, body: bytes) -> bytes:
+    """Build a complete HTTP/1.0 response so it can be sent with a single write."""
+    head = (
+        f"HTTP/1.0 {status}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n"
+        "\r\n"
+    )
+    return head.encode("ascii") + body
+
+
+# The callback server only ever sends these two responses, so build them once
+_CALLBACK_OK = _http_response(
+    "200 OK",
+    "text/html; charset=utf-8",
+    b"<html><body><h3>WHOOP authorization received.</h3>"
+    b"<p>You can return to the terminal.</p></body></html>",
+)
+_CALLBACK_NOT_FOUND = _http_response("404 Not Found", "text/plain; charset=utf-8", b"Not Found")
+
 
-class OAuthCallbackHandler(BaseHTTPRequestHandler):
-    def do_GET(self):  # noqa: N802 (http.server signature)
-        parsed = urllib.parse.urlparse(self.path)
-        if parsed.path != "/callback":
-            self.send_response(404)
-            self.end_headers()
-            self.wfile.write(b"Not Found")
+@lru_cache(maxsize=None)
+def _callback_classes() -> Tuple[type, type]:
+    """Define the OAuth callback server and handler classes on first use.
+    
+    http.server and socketserver are only needed by the OAuth flow, so they are
+    imported here rather than on every CLI start.
+    
+    Returns:
+        Tuple of (server_class, handler_class)
+    """
+    import socketserver
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class OAuthCallbackHandler(BaseHTTPRequestHandler):
+        def do_GET(self):  # noqa: N802 (http.server signature)
+            path, _, query = self.path.partition("?")
+            if path != "/callback":
+                self.wfile.write(_CALLBACK_NOT_FOUND)
+                return
+
+            # OAuth callback parameters are single-valued, so a flat dict is enough; blank
+            # values need no filtering pass since the checks below treat "" as missing
+            params = dict(urllib.parse.parse_qsl(query, keep_blank_values=True))
+
+            # Store on server instance for retrieval
+            self.server.auth_result = {  # type: ignore[attr-defined]
+                "code": params.get("code"),
+                "state": params.get("state"),
+                "error": params.get("error"),
+            }
+
+            self.wfile.write(_CALLBACK_OK)
+            self.server.done.set()  # type: ignore[attr-defined]
+
+        def log_message(self, format, *args):  # noqa: A003 (shadow builtins)
+            # Silence default HTTPServer logging for cleaner CLI UX
             return
 
-        params = urllib.parse.parse_qs(parsed.query)
-        code = params.get("code", [None])[0]
-        state = params.get("state", [None])[0]
+    class _CallbackServer(ThreadingHTTPServer):
+        """HTTP server for the one-shot OAuth callback.
+        
+        Requests are handled on their own threads, so a browser's favicon fetch or
+        speculative preconnect can't hold up the real redirect; `done` is set once the
+        callback itself has been handled.
+        """
 
-        # Store on server instance for retrieval
-        self.server.auth_result = {  # type: ignore[attr-defined]
-            "code": code,
-            "state": state,
-            "error": params.get("error", [None])[0],
-        }
+        def __init__(self, *args: Any, **kwargs: Any) -> None:
+            self.done = threading.Event()
+            super().__init__(*args, **kwargs)
 
-        self.send_response(200)
-        self.send_header("Content-Type", "text/html")
-        self.end_headers()
-        self.wfile.write(
-            b"<html><body><h3>WHOOP authorization received.</h3>"
-            b"<p>You can return to the terminal.</p></body></html>"
-        )
+        def server_bind(self) -> None:
+            # HTTPServer.server_bind resolves the bind address with socket.getfqdn(), a
+            # reverse DNS lookup that can stall for seconds; a loopback callback needs no FQDN
+            socketserver.TCPServer.server_bind(self)
+            host, port = self.server_address[:2]
+            self.server_name = host
+            self.server_port = port
 
-    def log_message(self, format, *args):  # noqa: A003 (shadow builtins)
-        # Silence default HTTPServer logging for cleaner CLI UX
-        return
+    return _CallbackServer, OAuthCallbackHandler
 
 
-def start_local_server(host: str, port: int) -> Tuple[HTTPServer, str]:
-    server = HTTPServer((host, port), OAuthCallbackHandler)
+def start_local_server(host: str, port: int) -> Tuple[Any, str]:
+    server_class, handler_class = _callback_classes()
+    server = server_class((host, port), handler_class)
     url = f"http://{host}:{port}/callback"
     return server, url
 
 
+@lru_cache(maxsize=None)
+def _authorize_prefix(
+    authorization_url: str,
+    client_id: str,
+    redirect_uri: str,
+    scope: str,
+) -> str:
+    """Encode the parts of the authorize URL that only change with the client config.
+    
+    Values are percent-encoded with quote (spaces in the scope become %20, as RFC 3986
+    expects) rather than urlencode's default form-style quote_plus.
+    """
+    query = [
+        ("response_type", "code"),
+        ("client_id", client_id),
+        ("redirect_uri", redirect_uri),
+        ("scope", scope),
+    ]
+    return f"{authorization_url}?{urllib.parse.urlencode(query, quote_via=urllib.parse.quote)}"
+
+
 def build_authorize_url(
     authorization_url: str,
     client_id: str,
@@ -83,14 +232,129 @@ def build_authorize_url(
     scope: str,
     state: str,
 ) -> str:
-    query = {
-        "response_type": "code",
-        "client_id": client_id,
-        "redirect_uri": redirect_uri,
-        "scope": scope,
-        "state": state,
-    }
-    return f"{authorization_url}?{urllib.parse.urlencode(query)}"
+    prefix = _authorize_prefix(authorization_url, client_id, redirect_uri, scope)
+    return f"{prefix}&state={urllib.parse.quote(state)}"
+
+
+def _loads(response: requests.Response) -> Any:
+    """Decode a JSON response body, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+
+def _dumps(data: Any) -> str:
+    """Serialize data as indented JSON, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(data, indent=2)
+
+
+def _print_json(data: Any) -> None:
+    """Print data as JSON to stdout: indented for a terminal, compact when piped.
+    
+    Piped output skips the indentation nobody reads and is written as UTF-8 bytes
+    straight to the binary buffer, bypassing the text layer's encoding step.
+    """
+    buffer = getattr(sys.stdout, "buffer", None)
+    if buffer is None or sys.stdout.isatty():
+        print(_dumps(data))
+        return
+    if orjson is not None:
+        payload = orjson.dumps(data)
+    else:
+        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    # Flush text already printed so it stays ahead of the bytes written below
+    sys.stdout.flush()
+    buffer.write(payload + b"\n")
+    buffer.flush()
+
+
+class _BearerAuth(AuthBase):
+    """Attach a WHOOP access token to a request.
+    
+    Passing an auth object (rather than a raw Authorization header) also stops
+    requests from looking up ~/.netrc on every call, which would otherwise cost a
+    file stat/parse per request and could silently replace the bearer token.
+    """
+
+    def __init__(self, access_token: str) -> None:
+        self.header = f"Bearer {access_token}"
+
+    def __call__(self, request: requests.PreparedRequest) -> requests.PreparedRequest:
+        request.headers["Authorization"] = self.header
+        return request
+
+
+@lru_cache(maxsize=2 * NUM_BANDS)
+def _bearer_auth(access_token: str) -> _BearerAuth:
+    """Get the (immutable) auth object for a token, built once per token."""
+    return _BearerAuth(access_token)
+
+
+def _expires_at(tokens: Dict[str, object]) -> float:
+    """Compute when an access token should be proactively refreshed.
+    
+    Args:
+        tokens: Token response from WHOOP
+    
+    Returns:
+        Epoch seconds TOKEN_EXPIRY_MARGIN before expiry, or infinity if unknown
+    """
+    expires_in = tokens.get("expires_in")
+    if isinstance(expires_in, (int, float)):
+        return time.time() + expires_in - TOKEN_EXPIRY_MARGIN
+    return float("inf")
+
+
+def cache_band_tokens(
+    band_id: int,
+    access_token: str,
+    refresh_token: str,
+    expires_at: float = float("inf"),
+) -> None:
+    """Remember the current tokens for a band for the rest of this process."""
+    _TOKEN_CACHE[band_id] = (access_token, refresh_token, expires_at)
+
+
+def get_cached_band_tokens(band_id: int) -> Tuple[str, str]:
+    """Get access_token and refresh_token for a band, reading secrets.json only once.
+    
+    Args:
+        band_id: Band number (1-10)
+    
+    Returns:
+        Tuple of (access_token, refresh_token)
+    """
+    cached = _TOKEN_CACHE.get(band_id)
+    if cached is not None:
+        return cached[0], cached[1]
+    access_token, refresh_token = get_band_tokens(band_id)
+    if access_token:
+        # Tokens saved before expiries were persisted have none; the 401 fallback covers them
+        expires_at = get_band_token_expiry(band_id)
+        cache_band_tokens(
+            band_id,
+            access_token,
+            refresh_token,
+            float("inf") if expires_at is None else expires_at,
+        )
+    return access_token, refresh_token
+
+
+def _save_band_tokens(
+    band_id: int,
+    access_token: str,
+    refresh_token: str,
+    expires_at: Optional[float] = None,
+) -> None:
+    """Persist tokens for a band to secrets.json; safe to call from worker threads."""
+    # save_band_tokens serializes writers itself (across threads and processes)
+    save_band_tokens(band_id, access_token, refresh_token, expires_at=expires_at)
+
+
+# Token endpoint requests are always form-encoded; requests copies this, never mutates it
+_FORM_HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
 
 
 def exchange_code_for_tokens(
@@ -99,6 +363,8 @@ def exchange_code_for_tokens(
     client_secret: str,
     code: str,
     redirect_uri: str,
+    band_id: Optional[int] = None,
+    session: Optional[requests.Session] = None,
 ) -> Dict[str, object]:
     data = {
         "grant_type": "authorization_code",
@@ -107,28 +373,143 @@ def exchange_code_for_tokens(
         "client_id": client_id,
         "client_secret": client_secret,
     }
-    headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    response = requests.post(token_url, data=data, headers=headers, timeout=30)
+    # Defaults to the shared pooled session, so token calls reuse the API connection
+    response = (session or _SESSION).post(
+        token_url, data=data, headers=_FORM_HEADERS, timeout=30
+    )
     response.raise_for_status()
-    return response.json()
+    tokens = _loads(response)
+    access_token = tokens.get("access_token")
+    refresh_token = tokens.get("refresh_token")
+    if band_id is not None and isinstance(access_token, str) and isinstance(refresh_token, str):
+        cache_band_tokens(band_id, access_token, refresh_token, _expires_at(tokens))
+    return tokens
+
+@lru_cache(maxsize=None)
+def _refresh_body_prefix(client_id: str, client_secret: str) -> str:
+    """Form-encode the parts of a refresh request body that never change for a client."""
+    return urllib.parse.urlencode(
+        {
+            "grant_type": "refresh_token",
+            "client_id": client_id,
+            "client_secret": client_secret,
+            "scope": "offline",
+        }
+    )
+
 
 def refresh_access_token(
     token_url: str,
     client_id: str,
     client_secret: str,
     refresh_token: str,
+    band_id: Optional[int] = None,
+    session: Optional[requests.Session] = None,
 ) -> Dict[str, object]:
-    data = {
-        "grant_type": "refresh_token",
-        "refresh_token": refresh_token,
-        "client_id": client_id,
-        "client_secret": client_secret,
-        "scope": "offline",
-    }
-    headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    response = requests.post(token_url, data=data, headers=headers, timeout=30)
+    data = (
+        _refresh_body_prefix(client_id, client_secret)
+        + "&refresh_token="
+        + urllib.parse.quote_plus(refresh_token)
+    )
+    # Defaults to the shared pooled session, so token calls reuse the API connection
+    response = (session or _SESSION).post(
+        token_url, data=data, headers=_FORM_HEADERS, timeout=30
+    )
     response.raise_for_status()
-    return response.json()
+    tokens = _loads(response)
+    access_token = tokens.get("access_token")
+    new_refresh_token = tokens.get("refresh_token", refresh_token)
+    if band_id is not None and isinstance(access_token, str) and isinstance(new_refresh_token, str):
+        cache_band_tokens(band_id, access_token, new_refresh_token, _expires_at(tokens))
+    return tokens
+
+
+def _refresh_tokens(
+    token_url: str,
+    client_id: str,
+    client_secret: str,
+    access_token: str,
+    refresh_token: str,
+    band_id: Optional[int] = None,
+) -> Tuple[str, str]:
+    """Refresh the access token, at most once per band across concurrent callers.
+    
+    Args:
+        access_token: The access token the caller found to be expired
+        refresh_token: The refresh token the caller currently holds
+        band_id: Optional band number (1-10); enables locking and the cache check
+    
+    Returns:
+        Tuple of (new_access_token, new_refresh_token)
+    """
+    if band_id is None:
+        return _request_token_refresh(token_url, client_id, client_secret, refresh_token)
+    
+    with _REFRESH_LOCKS[band_id]:
+        # Double-check: another caller may have refreshed while we waited for the lock
+        cached = _TOKEN_CACHE.get(band_id)
+        if cached is not None and cached[0] != access_token:
+            return cached[0], cached[1]
+        return _request_token_refresh(
+            token_url, client_id, client_secret, refresh_token, band_id=band_id
+        )
+
+
+def _request_token_refresh(
+    token_url: str,
+    client_id: str,
+    client_secret: str,
+    refresh_token: str,
+    band_id: Optional[int] = None,
+) -> Tuple[str, str]:
+    """Refresh the access token, turning failures into actionable errors.
+    
+    Returns:
+        Tuple of (new_access_token, new_refresh_token)
+    """
+    if not refresh_token:
+        raise SystemExit(
+            "Cannot refresh token: refresh_token is missing or empty. "
+            "Please run OAuth flow again to get new tokens."
+        )
+    
+    try:
+        tokens = refresh_access_token(
+            token_url=token_url,
+            client_id=client_id,
+            client_secret=client_secret,
+            refresh_token=refresh_token,
+            band_id=band_id,
+        )
+    except requests.exceptions.HTTPError as e:
+        if band_id is not None:
+            _TOKEN_CACHE.pop(band_id, None)
+        if e.response is not None:
+            error_detail = ""
+            try:
+                error_body = e.response.json()
+                error_detail = f" Error: {error_body}"
+            except:
+                error_detail = f" Status: {e.response.status_code}"
+            raise SystemExit(
+                f"Failed to refresh access token.{error_detail} "
+                "The refresh_token may be expired or invalid. "
+                "Please run OAuth flow again to get new tokens."
+            )
+        raise
+    
+    new_access_token = tokens.get("access_token", "")
+    new_refresh_token = tokens.get("refresh_token", refresh_token)
+    if not new_access_token:
+        if band_id is not None:
+            _TOKEN_CACHE.pop(band_id, None)
+        raise SystemExit("Failed to refresh access token: no access_token in response")
+    
+    # WHOOP rotates the refresh token, so persist right away; otherwise a crash or a
+    # later failure in this run would leave secrets.json holding a dead refresh token
+    if band_id is not None:
+        _save_band_tokens(band_id, new_access_token, new_refresh_token, _expires_at(tokens))
+    return new_access_token, new_refresh_token
 
 
 def authenticated_request(
@@ -144,11 +525,14 @@ def authenticated_request(
     data: Optional[Dict[str, object]] = None,
     json_data: Optional[Dict[str, object]] = None,
     timeout: int = 30,
+    band_id: Optional[int] = None,
 ) -> Tuple[requests.Response, str, str]:
     """Make an authenticated request to WHOOP API with automatic token refresh.
     
     This middleware function handles token refresh automatically if the access token
     has expired (401 response). It will retry the request once with the new token.
+    When band_id is given and the cached token is known to be near expiry, the token
+    is refreshed up front instead of waiting for the 401.
     
     Args:
         method: HTTP method (GET, POST, PUT, DELETE, etc.)
@@ -163,18 +547,30 @@ def authenticated_request(
         data: Optional form data (for POST/PUT requests)
         json_data: Optional JSON data (for POST/PUT requests)
         timeout: Request timeout in seconds
+        band_id: Optional band number (1-10) used to look up cached token expiry
     
     Returns:
         Tuple of (response, access_token, refresh_token) - tokens may be updated if refreshed
     """
-    if headers is None:
-        headers = {}
-    headers["Authorization"] = f"Bearer {access_token}"
+    if band_id is not None:
+        cached = _TOKEN_CACHE.get(band_id)
+        if cached is not None and cached[0] == access_token and time.time() >= cached[2]:
+            with _OUTPUT_LOCK:
+                print("Access token about to expire. Refreshing...", file=sys.stderr)
+            access_token, refresh_token = _refresh_tokens(
+                token_url=token_url,
+                client_id=client_id,
+                client_secret=client_secret,
+                access_token=access_token,
+                refresh_token=refresh_token,
+                band_id=band_id,
+            )
     
     # Make the initial request
-    response = requests.request(
+    response = _SESSION.request(
         method=method,
         url=url,
+        auth=_bearer_auth(access_token),
         headers=headers,
         params=params,
         data=data,
@@ -182,191 +578,45 @@ def authenticated_request(
         timeout=timeout,
     )
     
-    # If 401, refresh token and retry (only once)
-    if response.status_code == 401:
-        print("Access token expired. Refreshing...")
-        
-        if not refresh_token:
-            raise SystemExit(
-                "Cannot refresh token: refresh_token is missing or empty. "
-                "Please run OAuth flow again to get new tokens."
-            )
-        
-        try:
-            tokens = refresh_access_token(
-                token_url=token_url,
-                client_id=client_id,
-                client_secret=client_secret,
-                refresh_token=refresh_token,
-            )
-        except requests.exceptions.HTTPError as e:
-            if e.response is not None:
-                error_detail = ""
-                try:
-                    error_body = e.response.json()
-                    error_detail = f" Error: {error_body}"
-                except:
-                    error_detail = f" Status: {e.response.status_code}"
-                raise SystemExit(
-                    f"Failed to refresh access token.{error_detail} "
-                    "The refresh_token may be expired or invalid. "
-                    "Please run OAuth flow again to get new tokens."
-                )
-            raise
-        
-        new_access_token = tokens.get("access_token", "")
-        new_refresh_token = tokens.get("refresh_token", refresh_token)
-        if not new_access_token:
-            raise SystemExit("Failed to refresh access token: no access_token in response")
-        
-        # Retry the request with new token
-        headers["Authorization"] = f"Bearer {new_access_token}"
-        response = requests.request(
-            method=method,
-            url=url,
-            headers=headers,
-            params=params,
-            data=data,
-            json=json_data,
-            timeout=timeout,
-        )
-        response.raise_for_status()
-        return response, new_access_token, new_refresh_token
-    else:
+    # Common case first: success needs no further checks
+    status = response.status_code
+    if status < 300:
+        return response, access_token, refresh_token
+    if status != 401:
         response.raise_for_status()
         return response, access_token, refresh_token
-
-
-def get_sleep_data(
-    token_url: str,
-    client_id: str,
-    client_secret: str,
-    access_token: str,
-    refresh_token: str,
-    limit: int = 25,
-    next_token: Optional[str] = None,
-    start: Optional[str] = None,
-    end: Optional[str] = None,
-) -> Tuple[Dict[str, object], str, str]:
-    """Fetch sleep data from WHOOP API with automatic token refresh.
-    
-    Args:
-        start: ISO 8601 date-time string. Returns records after or during this time.
-        end: ISO 8601 date-time string. Returns records that ended before this time.
     
-    Returns:
-        Tuple of (sleep_data, access_token, refresh_token) - tokens may be updated if refreshed
-    """
-    url = f"{API_BASE_URL}/developer/v2/activity/sleep"
-    params = {"limit": limit}
-    if next_token:
-        params["nextToken"] = next_token
-    if start:
-        params["start"] = start
-    if end:
-        params["end"] = end
+    # 401: refresh token and retry (only once)
+    with _OUTPUT_LOCK:
+        print("Access token expired. Refreshing...", file=sys.stderr)
     
-    response, new_access_token, new_refresh_token = authenticated_request(
-        method="GET",
-        url=url,
+    new_access_token, new_refresh_token = _refresh_tokens(
         token_url=token_url,
         client_id=client_id,
         client_secret=client_secret,
         access_token=access_token,
         refresh_token=refresh_token,
-        params=params,
+        band_id=band_id,
     )
     
-    return response.json(), new_access_token, new_refresh_token
-
-
-def get_cycle_data(
-    token_url: str,
-    client_id: str,
-    client_secret: str,
-    access_token: str,
-    refresh_token: str,
-    limit: int = 25,
-    next_token: Optional[str] = None,
-    start: Optional[str] = None,
-    end: Optional[str] = None,
-) -> Tuple[Dict[str, object], str, str]:
-    """Fetch cycle data from WHOOP API with automatic token refresh.
-    
-    Args:
-        start: ISO 8601 date-time string. Returns records after or during this time.
-        end: ISO 8601 date-time string. Returns records that ended before this time.
-    
-    Returns:
-        Tuple of (cycle_data, access_token, refresh_token) - tokens may be updated if refreshed
-    """
-    url = f"{API_BASE_URL}/developer/v2/cycle"
-    params = {"limit": limit}
-    if next_token:
-        params["nextToken"] = next_token
-    if start:
-        params["start"] = start
-    if end:
-        params["end"] = end
-    
-    response, new_access_token, new_refresh_token = authenticated_request(
-        method="GET",
-        url=url,
-        token_url=token_url,
-        client_id=client_id,
-        client_secret=client_secret,
-        access_token=access_token,
-        refresh_token=refresh_token,
-        params=params,
-    )
-    
-    return response.json(), new_access_token, new_refresh_token
-
-
-def get_recovery_data(
-    token_url: str,
-    client_id: str,
-    client_secret: str,
-    access_token: str,
-    refresh_token: str,
-    limit: int = 25,
-    next_token: Optional[str] = None,
-    start: Optional[str] = None,
-    end: Optional[str] = None,
-) -> Tuple[Dict[str, object], str, str]:
-    """Fetch recovery data from WHOOP API with automatic token refresh.
-    
-    Args:
-        start: ISO 8601 date-time string. Returns records after or during this time.
-        end: ISO 8601 date-time string. Returns records that ended before this time.
-    
-    Returns:
-        Tuple of (recovery_data, access_token, refresh_token) - tokens may be updated if refreshed
-    """
-    url = f"{API_BASE_URL}/developer/v2/recovery"
-    params = {"limit": limit}
-    if next_token:
-        params["nextToken"] = next_token
-    if start:
-        params["start"] = start
-    if end:
-        params["end"] = end
-    
-    response, new_access_token, new_refresh_token = authenticated_request(
-        method="GET",
-        url=url,
-        token_url=token_url,
-        client_id=client_id,
-        client_secret=client_secret,
-        access_token=access_token,
-        refresh_token=refresh_token,
+    # Retry the request with new token
+    response = _SESSION.request(
+        method=method,
+        url=url,
+        auth=_bearer_auth(new_access_token),
+        headers=headers,
         params=params,
+        data=data,
+        json=json_data,
+        timeout=timeout,
     )
-    
-    return response.json(), new_access_token, new_refresh_token
+    if response.status_code >= 300:
+        response.raise_for_status()
+    return response, new_access_token, new_refresh_token
 
 
-def get_workout_data(
+def _get_endpoint_data(
+    url: str,
     token_url: str,
     client_id: str,
     client_secret: str,
@@ -376,17 +626,19 @@ def get_workout_data(
     next_token: Optional[str] = None,
     start: Optional[str] = None,
     end: Optional[str] = None,
+    band_id: Optional[int] = None,
 ) -> Tuple[Dict[str, object], str, str]:
-    """Fetch workout data from WHOOP API with automatic token refresh.
+    """Fetch one page of data from a WHOOP endpoint with automatic token refresh.
     
     Args:
+        url: Collection URL of the endpoint (see ENDPOINT_URLS)
         start: ISO 8601 date-time string. Returns records after or during this time.
         end: ISO 8601 date-time string. Returns records that ended before this time.
+        band_id: Optional band number (1-10) used for cached token expiry
     
     Returns:
-        Tuple of (workout_data, access_token, refresh_token) - tokens may be updated if refreshed
+        Tuple of (page_data, access_token, refresh_token) - tokens may be updated if refreshed
     """
-    url = f"{API_BASE_URL}/developer/v2/activity/workout"
     params = {"limit": limit}
     if next_token:
         params["nextToken"] = next_token
@@ -404,9 +656,25 @@ def get_workout_data(
         access_token=access_token,
         refresh_token=refresh_token,
         params=params,
+        band_id=band_id,
     )
     
-    return response.json(), new_access_token, new_refresh_token
+    return _loads(response), new_access_token, new_refresh_token
+
+
+# Per-endpoint fetchers; each takes the same keyword arguments as _get_endpoint_data
+get_sleep_data = partial(_get_endpoint_data, ENDPOINT_URLS["sleep"])
+get_cycle_data = partial(_get_endpoint_data, ENDPOINT_URLS["cycle"])
+get_recovery_data = partial(_get_endpoint_data, ENDPOINT_URLS["recovery"])
+get_workout_data = partial(_get_endpoint_data, ENDPOINT_URLS["workout"])
+
+# Fetcher for each endpoint name, in the order `get_all` fetches them
+DATA_FETCHERS = {
+    "sleep": get_sleep_data,
+    "cycle": get_cycle_data,
+    "recovery": get_recovery_data,
+    "workout": get_workout_data,
+}
 
 
 def parse_args() -> argparse.Namespace:
@@ -420,7 +688,15 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "command",
         nargs="?",
-        choices=["get_sleep", "get_cycle", "get_recovery", "get_workout", "check_daily_compliance"],
+        choices=[
+            "get_sleep",
+            "get_cycle",
+            "get_recovery",
+            "get_workout",
+            "get_all",
+            "check_daily_compliance",
+            "refresh_all",
+        ],
         help="Command to execute (default: run OAuth flow)",
     )
     parser.add_argument(
@@ -428,7 +704,12 @@ def parse_args() -> argparse.Namespace:
         type=int,
         choices=range(1, NUM_BANDS + 1),
         metavar=f"{{1-{NUM_BANDS}}}",
-        help=f"Band number to authenticate or fetch data for (1-{NUM_BANDS}). Required for all commands except check_daily_compliance.",
+        help=f"Band number to authenticate or fetch data for (1-{NUM_BANDS}). Required for all commands except check_daily_compliance and refresh_all.",
+    )
+    parser.add_argument(
+        "--all-bands",
+        action="store_true",
+        help="Fetch data for all bands concurrently instead of a single --band (data commands only)",
     )
     parser.add_argument(
         "--no-browser",
@@ -464,6 +745,11 @@ def parse_args() -> argparse.Namespace:
         default=None,
         help="Date for compliance check in YYYY-MM-DD format (e.g., 2024-01-15). Required for check_daily_compliance.",
     )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Report progress for every page fetched with --all",
+    )
     parser.add_argument(
         "--to_csv",
         action="store_true",
@@ -476,6 +762,14 @@ def parse_args() -> argparse.Namespace:
     if args.command == "check_daily_compliance":
         if not args.date:
             parser.error("--date is required for check_daily_compliance command")
+    elif args.command == "refresh_all":
+        if args.band is not None or args.all_bands:
+            parser.error("refresh_all always refreshes every band; drop --band/--all-bands")
+    elif args.all_bands:
+        if args.command is None:
+            parser.error("--all-bands is only supported for data commands")
+        if args.band is not None:
+            parser.error("--band and --all-bands are mutually exclusive")
     else:
         if args.band is None:
             parser.error("--band is required for this command")
@@ -492,11 +786,13 @@ def validate_date_format(date_str: str) -> bool:
     Returns:
         True if valid, False otherwise
     """
+    if not _YMD.fullmatch(date_str):
+        return False
     try:
-        datetime.strptime(date_str, "%Y-%m-%d")
-        return True
+        date(int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10]))
     except ValueError:
         return False
+    return True
 
 
 def format_date_for_api(date_str: Optional[str], is_end: bool = False) -> Optional[str]:
@@ -549,19 +845,14 @@ def filter_records_by_start_date(records: List[object], start: Optional[str]) ->
     if not start or not records:
         return records
     
-    filtered = []
-    for record in records:
-        if isinstance(record, dict):
-            record_start = record.get("start")
-            # Include record if it started on or after the specified start date
-            # ISO 8601 strings are lexicographically sortable
-            if record_start and record_start >= start:
-                filtered.append(record)
-        else:
-            # Non-dict records pass through unchanged
-            filtered.append(record)
-    
-    return filtered
+    # Non-dict records pass through unchanged; dict records are kept if they started
+    # on or after the start date (ISO 8601 strings are lexicographically sortable)
+    return [
+        record
+        for record in records
+        if not isinstance(record, dict)
+        or ((record_start := record.get("start")) and record_start >= start)
+    ]
 
 
 def filter_ongoing_records_before_date(records: List[object], start: str) -> List[object]:
@@ -571,6 +862,9 @@ def filter_ongoing_records_before_date(records: List[object], start: str) -> Lis
     1. Started before the compliance check date, AND
     2. Are still ongoing (have null end date)
     
+    Start times are compared as ISO 8601 strings in the API's UTC "Z" format, so
+    no per-record date parsing is needed.
+    
     Args:
         records: List of records from WHOOP API
         start: ISO 8601 date-time string (start of compliance date)
@@ -581,21 +875,26 @@ def filter_ongoing_records_before_date(records: List[object], start: str) -> Lis
     if not records:
         return records
     
-    filtered = []
-    for record in records:
-        if isinstance(record, dict):
-            record_start = record.get("start")
-            record_end = record.get("end")
-            
-            # Exclude records that started before the date AND have null end (ongoing)
-            if record_start and record_start < start and record_end is None:
-                continue  # Skip this record
-            
-            filtered.append(record)
-        else:
-            filtered.append(record)
+    # Exclude records that started before the date AND have null end (ongoing)
+    return [record for record in records if not _is_ongoing_from_before(record, start)]
+
+
+def _is_ongoing_from_before(record: object, start: str) -> bool:
+    """Whether a record is still ongoing (null end) and started before start."""
+    return (
+        isinstance(record, dict)
+        and bool(record_start := record.get("start"))
+        and record_start < start
+        and record.get("end") is None
+    )
+
+
+def _has_compliant_record(records: List[object], start: str) -> bool:
+    """Whether any record survives filter_ongoing_records_before_date.
     
-    return filtered
+    Stops at the first match instead of building the filtered list.
+    """
+    return any(not _is_ongoing_from_before(record, start) for record in records)
 
 
 def flatten_dict(d: Dict[str, Any], parent_key: str = "", sep: str = "_") -> Dict[str, Any]:
@@ -697,7 +996,6 @@ def run_oauth_flow(band_id: int, no_browser: bool = False) -> None:
     scope = SCOPE
     authorization_url = DEFAULT_AUTH_URL
     token_url = DEFAULT_TOKEN_URL
-    redirect_uri_cfg = DEFAULT_REDIRECT_URI
 
     client_id, client_secret = get_client_credentials()
 
@@ -706,16 +1004,10 @@ def run_oauth_flow(band_id: int, no_browser: bool = False) -> None:
             "client_id/client_secret missing in secrets.json. Please fill them and rerun."
         )
 
-    parsed_redirect = urllib.parse.urlparse(redirect_uri_cfg)
-    if parsed_redirect.hostname is None or parsed_redirect.port is None:
-        raise SystemExit(
-            "REDIRECT_URI must include a hostname and port, e.g. http://localhost:8765/callback"
-        )
-
     # WHOOP requires the state parameter to be exactly 8 characters
     state = secrets.token_urlsafe(6)[:8]
 
-    server, redirect_uri = start_local_server(parsed_redirect.hostname, parsed_redirect.port)
+    server, redirect_uri = start_local_server(_PARSED_REDIRECT.hostname, _PARSED_REDIRECT.port)
 
     auth_url = build_authorize_url(
         authorization_url=authorization_url,
@@ -729,13 +1021,23 @@ def run_oauth_flow(band_id: int, no_browser: bool = False) -> None:
     print("Opening WHOOP authorization URL...")
     print(auth_url)
     if not no_browser:
-        webbrowser.open(auth_url, new=2)
-
+        import webbrowser  # only the OAuth flow needs it
+        
+        # Launching the browser can block for seconds (e.g. xdg-open); do it in the
+        # background so we are already waiting on the socket when the redirect lands
+        threading.Thread(
+            target=webbrowser.open, args=(auth_url,), kwargs={"new": 2}, daemon=True
+        ).start()
+
+    server_thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.1}, daemon=True
+    )
+    server_thread.start()
     try:
         # Wait up to 120 seconds for the OAuth redirect callback
-        server.timeout = 120
-        server.handle_request()
+        server.done.wait(timeout=120)
     finally:
+        server.shutdown()
         server.server_close()
 
     result: Optional[Dict[str, Optional[str]]] = getattr(server, "auth_result", None)  # type: ignore[attr-defined]
@@ -752,7 +1054,10 @@ def run_oauth_flow(band_id: int, no_browser: bool = False) -> None:
     if result.get("error"):
         raise SystemExit(f"Authorization failed: {result['error']}")
 
-    if result.get("state") != state:
+    # Constant-time compare; bytes, since compare_digest rejects non-ASCII str and the
+    # callback's state is whatever the redirect carried
+    returned_state = (result.get("state") or "").encode()
+    if not secrets.compare_digest(returned_state, state.encode()):
         raise SystemExit("State mismatch. Aborting.")
 
     code = result.get("code")
@@ -765,101 +1070,143 @@ def run_oauth_flow(band_id: int, no_browser: bool = False) -> None:
         client_secret=client_secret,
         code=code,
         redirect_uri=redirect_uri,
+        band_id=band_id,
     )
 
     # Update secrets with the new tokens for this band
     access_token = tokens.get("access_token")
     refresh_token = tokens.get("refresh_token")
     if isinstance(access_token, str) and isinstance(refresh_token, str):
-        save_band_tokens(band_id, access_token, refresh_token)
+        save_band_tokens(band_id, access_token, refresh_token, expires_at=_expires_at(tokens))
         print(f"Tokens saved for band {band_id}")
     else:
         raise SystemExit("Failed to get valid tokens from OAuth flow")
 
     # Print tokens as JSON to stdout
-    print(json.dumps(tokens, indent=2))
+    _print_json(tokens)
 
 
-def _fetch_all_pages(
-    data_fetcher,
+class _PageState:
+    """Tokens, first-page metadata and counters updated by _iter_all_pages."""
+
+    def __init__(self, access_token: str, refresh_token: str) -> None:
+        self.access_token = access_token
+        self.refresh_token = refresh_token
+        self.metadata: Dict[str, object] = {}
+        self.page_count = 0
+        self.record_count = 0
+        self.filtered_count = 0
+
+
+def _iter_all_pages(
+    state: _PageState,
+    url: str,
     token_url: str,
     client_id: str,
     client_secret: str,
-    access_token: str,
-    refresh_token: str,
     limit: int = 25,
     start: Optional[str] = None,
     end: Optional[str] = None,
-) -> Tuple[Dict[str, object], str, str]:
-    """Fetch all pages of data using pagination.
+    band_id: Optional[int] = None,
+    verbose: bool = False,
+) -> Iterator[object]:
+    """Yield records from every page of an endpoint, one page at a time.
+    
+    The query params are built once and reused for every page; only the nextToken
+    param changes between requests. Records that started before `start` are dropped
+    page by page, so callers need no second filtering pass. Tokens refreshed along
+    the way, metadata from the first page and page/record counts are recorded on
+    state, so callers can stream records (e.g. straight to disk) without
+    materializing them all.
     
     Args:
-        start: ISO 8601 date-time string. Returns records after or during this time.
+        state: Holds the current tokens on entry; updated as pages are fetched
+        url: Collection URL of the endpoint to page through (see ENDPOINT_URLS)
+        start: ISO 8601 date-time string. Returns records that started at or after this time.
         end: ISO 8601 date-time string. Returns records that ended before this time.
+        band_id: Optional band number (1-10) used for cached token expiry
+        verbose: If True, report progress for every page on stderr
     
-    Returns:
-        Tuple of (combined_data, access_token, refresh_token) - all records combined
+    Yields:
+        Individual records from each page
     """
-    all_records: List[object] = []
-    current_token = access_token
-    current_refresh = refresh_token
     next_token: Optional[str] = None
-    previous_next_token: Optional[str] = None
     seen_next_tokens: set = set()
-    page_count = 0
-    response_metadata: Dict[str, object] = {}
+    
+    params: Dict[str, object] = {"limit": limit}
+    if start:
+        params["start"] = start
+    if end:
+        params["end"] = end
     
     while True:
-        page_count += 1
-        records_before = len(all_records)
+        state.page_count += 1
+        page_count = state.page_count
         
         if next_token:
-            print(f"Fetching page {page_count} with next_token: {next_token[:30]}...", file=sys.stderr)
-        else:
-            print(f"Fetching page {page_count} (first page, no next_token)...", file=sys.stderr)
+            params["nextToken"] = next_token
         
         # Fetch the page
-        page_data, current_token, current_refresh = data_fetcher(
+        response, state.access_token, state.refresh_token = authenticated_request(
+            method="GET",
+            url=url,
             token_url=token_url,
             client_id=client_id,
             client_secret=client_secret,
-            access_token=current_token,
-            refresh_token=current_refresh,
-            limit=limit,
-            next_token=next_token,
-            start=start,
-            end=end,
+            access_token=state.access_token,
+            refresh_token=state.refresh_token,
+            params=params,
+            band_id=band_id,
         )
-        
-        # Debug: print response keys to help diagnose issues
-        if page_count == 1:
-            print(f"  Response keys: {list(page_data.keys()) if isinstance(page_data, dict) else 'Not a dict'}", file=sys.stderr)
+        page_data = _loads(response)
         
         # Preserve metadata from first page (excluding records and next_token)
         if page_count == 1 and isinstance(page_data, dict):
             for key, value in page_data.items():
                 if key not in ("records", "next_token"):
-                    response_metadata[key] = value
+                    state.metadata[key] = value
         
         # Extract records from the response (structure may vary by endpoint)
         # Most WHOOP endpoints return records in a 'records' key
         page_records: List[object] = []
         if isinstance(page_data, dict) and "records" in page_data:
             page_records = page_data["records"] if isinstance(page_data["records"], list) else []
-            all_records.extend(page_records)
         elif isinstance(page_data, list):
             page_records = page_data
-            all_records.extend(page_records)
         else:
-            # If structure is different, add the whole page
-            all_records.append(page_data)
+            # If structure is different, yield the whole page
+            page_records = [page_data]
+        
+        new_records_count = len(page_records)
+        state.record_count += new_records_count
         
-        records_after = len(all_records)
-        new_records_count = records_after - records_before
-        print(f"  Page {page_count}: fetched {new_records_count} records (total: {records_after})", file=sys.stderr)
+        if verbose:
+            # One write per page keeps progress output cheap and unbroken across threads
+            if next_token:
+                progress = [f"Fetching page {page_count} with next_token: {next_token[:30]}..."]
+            else:
+                progress = [f"Fetching page {page_count} (first page, no next_token)..."]
+            if page_count == 1:
+                # Debug: print response keys to help diagnose issues
+                progress.append(f"  Response keys: {list(page_data.keys()) if isinstance(page_data, dict) else 'Not a dict'}")
+            progress.append(f"  Page {page_count}: fetched {new_records_count} records (total: {state.record_count})")
+            sys.stderr.write("\n".join(progress) + "\n")
+        
+        # Client-side filter: drop records that started before the start date
+        kept_records = filter_records_by_start_date(page_records, start)
+        state.filtered_count += new_records_count - len(kept_records)
+        yield from kept_records
+        
+        # WHOOP returns records newest first, so once a whole page started before
+        # `start`, every later page would be filtered out client-side anyway
+        if start and page_records and all(
+            isinstance(record, dict) and record.get("start") and record["start"] < start
+            for record in page_records
+        ):
+            print(f"  Page {page_count}: all records started before {start}, stopping pagination.", file=sys.stderr)
+            break
         
         # Extract next_token from response
-        previous_next_token = next_token
         if isinstance(page_data, dict):
             next_token = page_data.get("next_token")
             if next_token and not isinstance(next_token, str):
@@ -877,32 +1224,72 @@ def _fetch_all_pages(
         if not next_token or (isinstance(next_token, str) and not next_token.strip()):
             break
         
-        # # Safety check: break if we got the same next_token twice (infinite loop protection)
-        # if next_token == previous_next_token:
-        #     print(f"  Warning: Same next_token returned twice, breaking to prevent infinite loop.", file=sys.stderr)
-        #     break
-        
-        # # Safety check: break if we've seen this next_token before (circular pagination)
-        # if next_token in seen_next_tokens:
-        #     print(f"  Warning: next_token was seen before, breaking to prevent infinite loop.", file=sys.stderr)
-        #     break
-        # seen_next_tokens.add(next_token)
+        # Safety check: break if we've seen this next_token before (circular pagination,
+        # which also covers the same next_token being returned twice in a row)
+        if next_token in seen_next_tokens:
+            print("  Warning: next_token was seen before, breaking to prevent infinite loop.", file=sys.stderr)
+            break
+        seen_next_tokens.add(next_token)
         
-        # # Safety check: break if no new records were fetched (API might be returning same page)
-        # if new_records_count == 0:
-        #     print(f"  Warning: No new records fetched on page {page_count}, breaking to prevent infinite loop.", file=sys.stderr)
-        #     break
+        # Safety check: break if no new records were fetched (API might be returning same page)
+        if new_records_count == 0:
+            print(f"  Warning: No new records fetched on page {page_count}, breaking to prevent infinite loop.", file=sys.stderr)
+            break
+    
+    print(f"Fetched {page_count} page(s) with {state.record_count} total records.", file=sys.stderr)
+    if state.filtered_count:
+        print(f"Filtered out {state.filtered_count} record(s) that started before {start}", file=sys.stderr)
+
+
+def _fetch_all_pages(
+    url: str,
+    token_url: str,
+    client_id: str,
+    client_secret: str,
+    access_token: str,
+    refresh_token: str,
+    limit: int = 25,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    band_id: Optional[int] = None,
+    verbose: bool = False,
+) -> Tuple[Dict[str, object], str, str]:
+    """Fetch all pages of data using pagination.
+    
+    Args:
+        url: Collection URL of the endpoint to page through (see ENDPOINT_URLS)
+        start: ISO 8601 date-time string. Returns records after or during this time.
+        end: ISO 8601 date-time string. Returns records that ended before this time.
+        band_id: Optional band number (1-10) used for cached token expiry
+        verbose: If True, report progress for every page on stderr
     
-    print(f"Fetched {page_count} page(s) with {len(all_records)} total records.", file=sys.stderr)
+    Returns:
+        Tuple of (combined_data, access_token, refresh_token) - all records combined
+    """
+    state = _PageState(access_token, refresh_token)
+    all_records = list(
+        _iter_all_pages(
+            state,
+            url=url,
+            token_url=token_url,
+            client_id=client_id,
+            client_secret=client_secret,
+            limit=limit,
+            start=start,
+            end=end,
+            band_id=band_id,
+            verbose=verbose,
+        )
+    )
     
     # Return combined data in the same structure as a single page
     combined_data: Dict[str, object] = {
-        **response_metadata,
+        **state.metadata,
         "records": all_records,
         "next_token": None,  # No more pages
     }
     
-    return combined_data, current_token, current_refresh
+    return combined_data, state.access_token, state.refresh_token
 
 
 def run_get_data(
@@ -916,7 +1303,9 @@ def run_get_data(
     to_csv: bool = False,
     start_date_raw: Optional[str] = None,
     end_date_raw: Optional[str] = None,
-) -> None:
+    verbose: bool = False,
+    print_output: bool = True,
+) -> Any:
     """Generic helper to fetch data from WHOOP API with automatic token refresh.
     
     Args:
@@ -930,11 +1319,17 @@ def run_get_data(
         to_csv: If True, save output to CSV instead of printing JSON
         start_date_raw: Original start date in YYYY-MM-DD format (for CSV filename)
         end_date_raw: Original end date in YYYY-MM-DD format (for CSV filename)
+        verbose: If True, report progress for every page on stderr
+        print_output: If False, only return the data instead of printing it, so
+            callers fetching several bands or endpoints can print one combined document
+    
+    Returns:
+        The fetched data
     """
     token_url = DEFAULT_TOKEN_URL
     
     client_id, client_secret = get_client_credentials()
-    access_token, refresh_token = get_band_tokens(band_id)
+    access_token, refresh_token = get_cached_band_tokens(band_id)
 
     if not client_id or not client_secret:
         raise SystemExit(
@@ -960,7 +1355,7 @@ def run_get_data(
     # Fetch data (will auto-refresh token if expired)
     if fetch_all:
         data, new_access_token, new_refresh_token = _fetch_all_pages(
-            data_fetcher=data_fetcher,
+            url=ENDPOINT_URLS[endpoint_name],
             token_url=token_url,
             client_id=client_id,
             client_secret=client_secret,
@@ -969,6 +1364,8 @@ def run_get_data(
             limit=limit,
             start=start,
             end=end,
+            band_id=band_id,
+            verbose=verbose,
         )
     else:
         data, new_access_token, new_refresh_token = data_fetcher(
@@ -980,15 +1377,16 @@ def run_get_data(
             limit=limit,
             start=start,
             end=end,
+            band_id=band_id,
         )
 
-    # Update secrets if tokens were refreshed
+    # Refreshed tokens were already persisted by authenticated_request
     if new_access_token != access_token or new_refresh_token != refresh_token:
-        save_band_tokens(band_id, new_access_token, new_refresh_token)
         print(f"Tokens refreshed and saved for band {band_id}", file=sys.stderr)
 
     # Client-side filter: exclude records that started before the specified start date
-    if start and isinstance(data, dict) and "records" in data:
+    # (paginated fetches already filtered each page as it arrived)
+    if start and not fetch_all and isinstance(data, dict) and "records" in data:
         original_count = len(data["records"]) if isinstance(data["records"], list) else 0
         data["records"] = filter_records_by_start_date(data["records"], start)
         filtered_count = len(data["records"])
@@ -1016,21 +1414,247 @@ def run_get_data(
         # Save JSON file with the same base name
         json_filepath = csv_filepath.replace(".csv", ".json")
         with open(json_filepath, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+            f.write(_dumps(data))
         
-        print(f"Saved {len(records)} record(s) to:", file=sys.stderr)
-        print(f"  CSV:  {csv_filepath}", file=sys.stderr)
-        print(f"  JSON: {json_filepath}", file=sys.stderr)
-    else:
+        with _OUTPUT_LOCK:
+            print(f"Saved {len(records)} record(s) to:", file=sys.stderr)
+            print(f"  CSV:  {csv_filepath}", file=sys.stderr)
+            print(f"  JSON: {json_filepath}", file=sys.stderr)
+    elif print_output:
         # Print data as JSON to stdout
-        print(json.dumps(data, indent=2))
+        with _OUTPUT_LOCK:
+            _print_json(data)
+    return data
+
+
+def run_get_data_all_bands(
+    data_fetcher,
+    endpoint_name: str,
+    limit: int = 25,
+    fetch_all: bool = False,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    to_csv: bool = False,
+    start_date_raw: Optional[str] = None,
+    end_date_raw: Optional[str] = None,
+    verbose: bool = False,
+) -> None:
+    """Fetch data for every band concurrently.
+    
+    Each band runs run_get_data on a worker thread sharing the pooled HTTP session.
+    Pagination within a band stays sequential; bands that fail (e.g. missing tokens)
+    are reported on stderr without stopping the others. Unless saving to CSV, the
+    results are printed as one JSON document keyed by band number, in band order.
+    Exits with an error if any band failed.
+    
+    Args:
+        data_fetcher: Function that fetches data (get_sleep_data, get_cycle_data, etc.)
+        endpoint_name: Name of the endpoint (sleep, cycle, recovery, workout)
+        limit: Maximum number of records per page
+        fetch_all: If True, fetch all pages using pagination
+        start: ISO 8601 date-time string. Returns records after or during this time.
+        end: ISO 8601 date-time string. Returns records that ended before this time.
+        to_csv: If True, save output to CSV instead of printing JSON
+        start_date_raw: Original start date in YYYY-MM-DD format (for CSV filename)
+        end_date_raw: Original end date in YYYY-MM-DD format (for CSV filename)
+        verbose: If True, report progress for every page on stderr
+    """
+    results = _run_get_data_jobs(
+        [(band_id, data_fetcher, endpoint_name) for band_id in range(1, NUM_BANDS + 1)],
+        max_workers=MAX_BAND_WORKERS,
+        limit=limit,
+        fetch_all=fetch_all,
+        start=start,
+        end=end,
+        to_csv=to_csv,
+        start_date_raw=start_date_raw,
+        end_date_raw=end_date_raw,
+        verbose=verbose,
+    )
+    if not to_csv:
+        _print_json({str(band_id): data for (band_id, _), data in results.items()})
+    _exit_on_job_failures(results, NUM_BANDS)
+
+
+def run_get_all_endpoints(
+    band_id: Optional[int],
+    limit: int = 25,
+    fetch_all: bool = False,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    to_csv: bool = False,
+    start_date_raw: Optional[str] = None,
+    end_date_raw: Optional[str] = None,
+    verbose: bool = False,
+) -> None:
+    """Fetch sleep, cycle, recovery and workout data for one band or all bands concurrently.
+    
+    Every band/endpoint pair runs on its own worker thread; a band's per-band refresh
+    lock ensures only one of its endpoints refreshes an expired token. Unless saving
+    to CSV, the results are printed as one JSON document keyed by endpoint name, or
+    by band number and then endpoint name when fetching all bands. Exits with an
+    error if any fetch failed.
+    
+    Args:
+        band_id: Band number (1-10) to fetch data for, or None for every band
+        limit: Maximum number of records per page
+        fetch_all: If True, fetch all pages using pagination
+        start: ISO 8601 date-time string. Returns records after or during this time.
+        end: ISO 8601 date-time string. Returns records that ended before this time.
+        to_csv: If True, save output to CSV instead of printing JSON
+        start_date_raw: Original start date in YYYY-MM-DD format (for CSV filename)
+        end_date_raw: Original end date in YYYY-MM-DD format (for CSV filename)
+        verbose: If True, report progress for every page on stderr
+    """
+    band_ids = range(1, NUM_BANDS + 1) if band_id is None else [band_id]
+    jobs = [
+        (job_band_id, data_fetcher, endpoint_name)
+        for job_band_id in band_ids
+        for endpoint_name, data_fetcher in DATA_FETCHERS.items()
+    ]
+    results = _run_get_data_jobs(
+        jobs,
+        max_workers=min(len(jobs), MAX_FETCH_WORKERS),
+        limit=limit,
+        fetch_all=fetch_all,
+        start=start,
+        end=end,
+        to_csv=to_csv,
+        start_date_raw=start_date_raw,
+        end_date_raw=end_date_raw,
+        verbose=verbose,
+    )
+    if not to_csv:
+        if band_id is None:
+            by_band: Dict[str, Dict[str, Any]] = {}
+            for (job_band_id, endpoint_name), data in results.items():
+                by_band.setdefault(str(job_band_id), {})[endpoint_name] = data
+            _print_json(by_band)
+        else:
+            _print_json({endpoint_name: data for (_, endpoint_name), data in results.items()})
+    _exit_on_job_failures(results, len(jobs))
+
+
+def _run_get_data_jobs(
+    jobs: List[Tuple[int, Any, str]],
+    max_workers: int,
+    **kwargs: Any,
+) -> Dict[Tuple[int, str], Any]:
+    """Run run_get_data for each (band_id, data_fetcher, endpoint_name) job on a thread pool.
+    
+    Jobs that fail (e.g. a band with missing tokens) are reported on stderr without
+    stopping the others. Remaining keyword arguments are passed to run_get_data.
+    
+    Returns:
+        Data of the jobs that succeeded, keyed by (band_id, endpoint_name) in job order
+    """
+    def run_job(job: Tuple[int, Any, str]) -> Tuple[bool, Any]:
+        band_id, data_fetcher, endpoint_name = job
+        try:
+            data = run_get_data(
+                data_fetcher,
+                band_id=band_id,
+                endpoint_name=endpoint_name,
+                print_output=False,
+                **kwargs,
+            )
+            return True, data
+        except SystemExit as e:
+            with _OUTPUT_LOCK:
+                print(f"  Band {band_id} {endpoint_name}: SKIPPED - {e}", file=sys.stderr)
+        except Exception as e:
+            with _OUTPUT_LOCK:
+                print(f"  Band {band_id} {endpoint_name}: ERROR - {e}", file=sys.stderr)
+        return False, None
+    
+    results: Dict[Tuple[int, str], Any] = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for (band_id, _, endpoint_name), (ok, data) in zip(jobs, executor.map(run_job, jobs)):
+            if ok:
+                results[(band_id, endpoint_name)] = data
+    return results
+
+
+def _exit_on_job_failures(results: Dict[Tuple[int, str], Any], job_count: int) -> None:
+    """Exit with an error if any of job_count fetch jobs is missing from results."""
+    failed = job_count - len(results)
+    if failed:
+        raise SystemExit(f"{failed} of {job_count} fetch(es) failed; see messages above.")
+
+
+# Endpoints that must each have a record for a band to count as compliant
+COMPLIANCE_ENDPOINTS = ("sleep", "cycle", "recovery")
+
+
+def _check_endpoint(
+    endpoint_name: str,
+    band_id: int,
+    token_url: str,
+    client_id: str,
+    client_secret: str,
+    access_token: str,
+    refresh_token: str,
+    start_date: str,
+    end_date: str,
+) -> bool:
+    """Check whether one endpoint has a valid record for the compliance day.
+    
+    Returns:
+        True if at least one record started on or after start_date
+    """
+    data_fetcher = DATA_FETCHERS[endpoint_name]
+    try:
+        # Existence is all that matters, so probe with a single record first; only if
+        # that record is an ongoing one from an earlier day do we read the rest.
+        # Refreshes are deduplicated per band, so sibling endpoints reuse one new token.
+        next_token = None
+        for limit in (1, 25):
+            data, access_token, refresh_token = data_fetcher(
+                token_url=token_url,
+                client_id=client_id,
+                client_secret=client_secret,
+                access_token=access_token,
+                refresh_token=refresh_token,
+                limit=limit,
+                next_token=next_token,
+                start=start_date,
+                end=end_date,
+                band_id=band_id,
+            )
+            
+            # Check if there is at least one valid record
+            records = []
+            if isinstance(data, dict) and "records" in data:
+                records = data["records"] if isinstance(data["records"], list) else []
+            elif isinstance(data, list):
+                records = data
+            
+            # Ignore ongoing records that started before the compliance date
+            if _has_compliant_record(records, start_date):
+                return True
+            
+            next_token = data.get("next_token") if isinstance(data, dict) else None
+            if not next_token:
+                return False
+        return False
+            
+    except SystemExit as e:
+        # Token refresh failed or other auth error
+        with _OUTPUT_LOCK:
+            print(f"  Band {band_id} {endpoint_name}: AUTH ERROR - {e}", file=sys.stderr)
+    except Exception as e:
+        # API error or other issue
+        with _OUTPUT_LOCK:
+            print(f"  Band {band_id} {endpoint_name}: ERROR - {e}", file=sys.stderr)
+    return False
 
 
 def run_daily_compliance_check(date_str: str) -> None:
     """Check daily compliance for all bands on a specific date.
     
-    Iterates through all 10 bands and checks if there is at least one record
-    for sleep, cycle, and recovery endpoints for the given day.
+    Checks every band for at least one record from the sleep, cycle, and recovery
+    endpoints on the given day. All band/endpoint checks share one thread pool
+    sized to the HTTP connection pool, so every call has a keep-alive connection.
     
     Args:
         date_str: Date in YYYY-MM-DD format
@@ -1041,8 +1665,9 @@ def run_daily_compliance_check(date_str: str) -> None:
             f"Invalid date format: '{date_str}'. Please use YYYY-MM-DD format (e.g., 2024-01-15)."
         )
     
-    start_date = f"{date_str}T00:00:00.000Z"
-    end_date = f"{date_str}T23:59:59.999Z"
+    # Built once per run and compared as plain strings by the record filters
+    start_date = format_date_for_api(date_str, is_end=False)
+    end_date = format_date_for_api(date_str, is_end=True)
     
     token_url = DEFAULT_TOKEN_URL
     client_id, client_secret = get_client_credentials()
@@ -1055,72 +1680,45 @@ def run_daily_compliance_check(date_str: str) -> None:
     # Track failures: {band_id: [list of failed endpoints]}
     failures: Dict[str, List[str]] = {}
     
-    # Define the endpoints to check
-    endpoints = [
-        ("sleep", get_sleep_data),
-        ("cycle", get_cycle_data),
-        ("recovery", get_recovery_data),
-    ]
-    
     print(f"Checking daily compliance for {date_str}...", file=sys.stderr)
     
+    # One (band_id, endpoint_name, access_token, refresh_token) job per API call
+    jobs: List[Tuple[int, str, str, str]] = []
+    band_failures: Dict[int, List[str]] = defaultdict(list)
     for band_id in range(1, NUM_BANDS + 1):
-        access_token, refresh_token = get_band_tokens(band_id)
-        
+        access_token, refresh_token = get_cached_band_tokens(band_id)
         if not access_token or not refresh_token:
             # Band not authenticated - mark all endpoints as failed
-            failures[str(band_id)] = ["sleep", "cycle", "recovery"]
+            band_failures[band_id] = list(COMPLIANCE_ENDPOINTS)
             print(f"  Band {band_id}: NOT AUTHENTICATED (missing tokens)", file=sys.stderr)
             continue
-        
-        band_failures: List[str] = []
-        current_access_token = access_token
-        current_refresh_token = refresh_token
-        
-        for endpoint_name, data_fetcher in endpoints:
-            try:
-                data, new_access_token, new_refresh_token = data_fetcher(
-                    token_url=token_url,
-                    client_id=client_id,
-                    client_secret=client_secret,
-                    access_token=current_access_token,
-                    refresh_token=current_refresh_token,
-                    limit=25,
-                    start=start_date,
-                    end=end_date,
-                )
-                
-                # Update tokens if refreshed
-                if new_access_token != current_access_token or new_refresh_token != current_refresh_token:
-                    current_access_token = new_access_token
-                    current_refresh_token = new_refresh_token
-                    save_band_tokens(band_id, new_access_token, new_refresh_token)
-                
-                # Check if there is at least one valid record
-                records = []
-                if isinstance(data, dict) and "records" in data:
-                    records = data["records"] if isinstance(data["records"], list) else []
-                elif isinstance(data, list):
-                    records = data
-                
-                # Filter out ongoing records that started before the compliance date
-                records = filter_ongoing_records_before_date(records, start_date)
-                
-                if len(records) == 0:
-                    band_failures.append(endpoint_name)
-                    
-            except SystemExit as e:
-                # Token refresh failed or other auth error
-                print(f"  Band {band_id} {endpoint_name}: AUTH ERROR - {e}", file=sys.stderr)
-                band_failures.append(endpoint_name)
-            except Exception as e:
-                # API error or other issue
-                print(f"  Band {band_id} {endpoint_name}: ERROR - {e}", file=sys.stderr)
-                band_failures.append(endpoint_name)
-        
-        if band_failures:
-            failures[str(band_id)] = band_failures
-            print(f"  Band {band_id}: MISSING {band_failures}", file=sys.stderr)
+        for endpoint_name in COMPLIANCE_ENDPOINTS:
+            jobs.append((band_id, endpoint_name, access_token, refresh_token))
+    
+    def check_job(job: Tuple[int, str, str, str]) -> bool:
+        band_id, endpoint_name, access_token, refresh_token = job
+        return _check_endpoint(
+            endpoint_name,
+            band_id=band_id,
+            token_url=token_url,
+            client_id=client_id,
+            client_secret=client_secret,
+            access_token=access_token,
+            refresh_token=refresh_token,
+            start_date=start_date,
+            end_date=end_date,
+        )
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(len(jobs), HTTP_POOL_SIZE))) as executor:
+        for (band_id, endpoint_name, _, _), ok in zip(jobs, executor.map(check_job, jobs)):
+            if not ok:
+                band_failures[band_id].append(endpoint_name)
+    
+    # Report in band order once every band has finished
+    for band_id in range(1, NUM_BANDS + 1):
+        if band_failures[band_id]:
+            failures[str(band_id)] = band_failures[band_id]
+            print(f"  Band {band_id}: MISSING {band_failures[band_id]}", file=sys.stderr)
         else:
             print(f"  Band {band_id}: OK", file=sys.stderr)
     
@@ -1128,70 +1726,98 @@ def run_daily_compliance_check(date_str: str) -> None:
     if not failures:
         print("DAILY COMPLIANCE SUCCESSFUL FOR ALL BANDS")
     else:
-        print(json.dumps(failures, indent=2))
+        _print_json(failures)
+
+
+def refresh_all_bands() -> None:
+    """Refresh the access token of every authenticated band concurrently.
+    
+    Each band's refresh is an independent POST to the token endpoint, so they run on
+    a thread pool sharing the pooled HTTP session. Each band's rotated tokens are
+    saved as soon as its refresh returns. Exits with an error if any authenticated
+    band failed to refresh.
+    """
+    token_url = DEFAULT_TOKEN_URL
+    client_id, client_secret = get_client_credentials()
+    
+    if not client_id or not client_secret:
+        raise SystemExit(
+            "client_id/client_secret missing in secrets.json. Please fill them and rerun."
+        )
+    
+    # Band status lines, reported in band order once every refresh has finished
+    results: Dict[int, str] = {}
+    band_tokens: Dict[int, Tuple[str, str]] = {}
+    for band_id in range(1, NUM_BANDS + 1):
+        access_token, refresh_token = get_cached_band_tokens(band_id)
+        if not access_token or not refresh_token:
+            results[band_id] = "NOT AUTHENTICATED (missing tokens)"
+        else:
+            band_tokens[band_id] = (access_token, refresh_token)
+    
+    def refresh_band(band_id: int) -> None:
+        access_token, refresh_token = band_tokens[band_id]
+        _refresh_tokens(
+            token_url=token_url,
+            client_id=client_id,
+            client_secret=client_secret,
+            access_token=access_token,
+            refresh_token=refresh_token,
+            band_id=band_id,
+        )
+    
+    with ThreadPoolExecutor(max_workers=MAX_BAND_WORKERS) as executor:
+        futures = {executor.submit(refresh_band, band_id): band_id for band_id in band_tokens}
+        for future in as_completed(futures):
+            band_id = futures[future]
+            try:
+                future.result()
+                results[band_id] = "REFRESHED"
+            except SystemExit as e:
+                results[band_id] = f"FAILED - {e}"
+            except Exception as e:
+                results[band_id] = f"ERROR - {e}"
+    
+    for band_id in sorted(results):
+        print(f"  Band {band_id}: {results[band_id]}", file=sys.stderr)
+    refreshed = sum(1 for status in results.values() if status == "REFRESHED")
+    print(f"Refreshed tokens for {refreshed} of {NUM_BANDS} band(s)")
+    if refreshed < len(band_tokens):
+        raise SystemExit(f"{len(band_tokens) - refreshed} band refresh(es) failed; see messages above.")
 
 
 def main() -> None:
     args = parse_args()
+    migrate_secrets()
 
     # Format dates to ISO 8601 format for API
     start_date = format_date_for_api(args.start, is_end=False)
     end_date = format_date_for_api(args.end, is_end=True)
 
-    if args.command == "get_sleep":
-        run_get_data(
-            get_sleep_data,
-            band_id=args.band,
-            endpoint_name="sleep",
-            limit=args.limit,
-            fetch_all=args.all,
-            start=start_date,
-            end=end_date,
-            to_csv=args.to_csv,
-            start_date_raw=args.start,
-            end_date_raw=args.end,
-        )
-    elif args.command == "get_cycle":
-        run_get_data(
-            get_cycle_data,
-            band_id=args.band,
-            endpoint_name="cycle",
-            limit=args.limit,
-            fetch_all=args.all,
-            start=start_date,
-            end=end_date,
-            to_csv=args.to_csv,
-            start_date_raw=args.start,
-            end_date_raw=args.end,
-        )
-    elif args.command == "get_recovery":
-        run_get_data(
-            get_recovery_data,
-            band_id=args.band,
-            endpoint_name="recovery",
-            limit=args.limit,
-            fetch_all=args.all,
-            start=start_date,
-            end=end_date,
-            to_csv=args.to_csv,
-            start_date_raw=args.start,
-            end_date_raw=args.end,
-        )
-    elif args.command == "get_workout":
-        run_get_data(
-            get_workout_data,
-            band_id=args.band,
-            endpoint_name="workout",
-            limit=args.limit,
-            fetch_all=args.all,
-            start=start_date,
-            end=end_date,
-            to_csv=args.to_csv,
-            start_date_raw=args.start,
-            end_date_raw=args.end,
-        )
+    fetch_kwargs = dict(
+        limit=args.limit,
+        fetch_all=args.all,
+        start=start_date,
+        end=end_date,
+        to_csv=args.to_csv,
+        start_date_raw=args.start,
+        end_date_raw=args.end,
+        verbose=args.verbose,
+    )
+
+    endpoint_name = (args.command or "").replace("get_", "", 1)
+    if endpoint_name in DATA_FETCHERS:
+        data_fetcher = DATA_FETCHERS[endpoint_name]
+        if args.all_bands:
+            run_get_data_all_bands(data_fetcher, endpoint_name=endpoint_name, **fetch_kwargs)
+        else:
+            run_get_data(data_fetcher, band_id=args.band, endpoint_name=endpoint_name, **fetch_kwargs)
+    elif args.command == "get_all":
+        run_get_all_endpoints(None if args.all_bands else args.band, **fetch_kwargs)
     elif args.command == "check_daily_compliance":
         run_daily_compliance_check(date_str=args.date)
+    elif args.command == "refresh_all":
+        refresh_all_bands()
     else:
         # Default: run OAuth flow
         run_oauth_flow(band_id=args.band, no_browser=args.no_browser)
@@ -1,6 +1,23 @@
+import copy
 import json
+import math
+import mmap
 import os
-from typing import Any, Dict, Tuple
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib json module
+    orjson = None
+
+try:
+    import fcntl
+except ImportError:  # Windows; file locking goes through msvcrt instead
+    fcntl = None
+    import msvcrt
 
 
 DEFAULT_SECRETS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "secrets.json")
@@ -8,10 +25,168 @@ DEFAULT_SECRETS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)),
 # Number of bands supported
 NUM_BANDS = 10
 
+# Valid band_id values, for a single membership test when validating arguments
+VALID_BAND_IDS = frozenset(range(1, NUM_BANDS + 1))
+
+# Secrets-dict key for each band_id (index 0 unused), so lookups skip str(band_id)
+_BAND_KEYS = ("",) + tuple(str(band_id) for band_id in range(1, NUM_BANDS + 1))
+
+# (file signature, parsed secrets, typed view) per file path, kept in sync by
+# save_secrets; the signature lets load_secrets notice edits made outside this process
+_SECRETS_CACHE: Dict[str, Tuple[Tuple[int, int], Dict[str, Any], "Secrets"]] = {}
+_CACHE_LOCK = threading.Lock()
+
+# Paths ensure_secrets_file has already seen on disk, so later calls skip the stat
+_ENSURED: Set[str] = set()
+
+# Flags for creating secrets files: fail rather than reuse an existing file, and
+# skip Windows newline translation
+_CREATE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+
+# Files larger than this are parsed from a memory map instead of a read() copy
+_MMAP_THRESHOLD = 64 * 1024
+
+# Held across load-modify-save sequences so concurrent writers don't drop each other's
+# changes; reentrant so a transaction can call helpers that also take it
+_WRITE_LOCK = threading.RLock()
+
+# Secrets paths whose file lock the current thread holds, so nested entries don't
+# flock a second descriptor (which would block on the first)
+_HELD_FILE_LOCKS = threading.local()
+
+
+@contextmanager
+def _write_lock(path: str) -> Iterator[None]:
+    """Hold the write lock for a secrets file, across threads and processes.
+    
+    Threads take _WRITE_LOCK; other processes are kept out by an advisory lock on a
+    sidecar "<path>.lock" file. The secrets file itself can't carry the lock, since
+    save_secrets replaces it with a new file on every write. Reentrant: only the
+    outermost entry on a thread takes the file lock.
+    """
+    with _WRITE_LOCK:
+        held: Set[str] = _HELD_FILE_LOCKS.__dict__.setdefault("paths", set())
+        if path in held:
+            yield
+            return
+        fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            held.add(path)
+            try:
+                yield
+            finally:
+                held.discard(path)
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                else:
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+
+def _loads(raw: bytes) -> Dict[str, Any]:
+    """Parse secrets file contents, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _read_secrets_file(path: str, size: int) -> Dict[str, Any]:
+    """Read and parse a secrets file.
+    
+    Large files are memory-mapped and handed to orjson as a buffer, saving a full
+    userspace copy of the bytes; stdlib json can't parse a buffer, so the fallback
+    always reads.
+    """
+    with open(path, "rb") as f:
+        if orjson is None or size <= _MMAP_THRESHOLD:
+            return _loads(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                return orjson.loads(view)
+
+
+def _dumps(data: Dict[str, Any], pretty: bool = False) -> bytes:
+    """Serialize secrets as UTF-8 JSON, using orjson when it is installed.
+    
+    Compact unless pretty is set; stdlib json's indented encoding takes a much
+    slower pure-Python path.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        return json.dumps(data, indent=2).encode("utf-8")
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def _file_signature(path: str) -> Tuple[int, int]:
+    """Identify a version of a file by (mtime in ns, size).
+    
+    Nanosecond mtimes avoid float rounding, and the size catches rewrites that land
+    within the timestamp granularity of coarse filesystems.
+    """
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+# repr=False: the generated repr would print the client secret and every token
+@dataclass(repr=False)
+class Secrets:
+    """Typed read-only view of secrets.json.
+    
+    Per-band fields are lists indexed by band_id (index 0 unused), so the token
+    accessors are plain list indexing with values already coerced. Writes still go
+    through the raw dict.
+    """
+    
+    __slots__ = (
+        "client_id",
+        "client_secret",
+        "access",
+        "refresh",
+        "expires_at",
+    )
+    
+    client_id: str
+    client_secret: str
+    access: List[str]
+    refresh: List[str]
+    expires_at: List[Optional[float]]
+    
+    @classmethod
+    def from_json_obj(cls, data: Dict[str, Any]) -> "Secrets":
+        """Build from the parsed secrets.json object."""
+        access, refresh, expires_at = [""], [""], [None]
+        for band_key in _BAND_KEYS[1:]:
+            band_data = data.get(band_key)
+            if not isinstance(band_data, dict):
+                band_data = {}
+            band_expiry = band_data.get("access_token_expires_at")
+            access.append(band_data.get("access_token") or "")
+            refresh.append(band_data.get("refresh_token") or "")
+            expires_at.append(
+                float(band_expiry) if isinstance(band_expiry, (int, float)) else None
+            )
+        return cls(
+            client_id=data.get("client_id") or "",
+            client_secret=data.get("client_secret") or "",
+            access=access,
+            refresh=refresh,
+            expires_at=expires_at,
+        )
+
 
 def ensure_secrets_file(path: str = DEFAULT_SECRETS_PATH) -> None:
     """Ensure secrets file exists with correct structure for multi-band support."""
+    if path in _ENSURED:
+        return
     if os.path.exists(path):
+        _ENSURED.add(path)
         return
     initial: Dict[str, Any] = {
         "client_id": "",
@@ -19,25 +194,169 @@ def ensure_secrets_file(path: str = DEFAULT_SECRETS_PATH) -> None:
     }
     # Add empty token entries for each band (1-10)
     for band_id in range(1, NUM_BANDS + 1):
-        initial[str(band_id)] = {
+        initial[_BAND_KEYS[band_id]] = {
             "access_token": "",
             "refresh_token": "",
         }
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(initial, f, indent=2)
+    # Owner-only, since the file will hold the client secret and refresh tokens
+    try:
+        fd = os.open(path, _CREATE_FLAGS, 0o600)
+    except FileExistsError:
+        # Another process created it first
+        _ENSURED.add(path)
+        return
+    with os.fdopen(fd, "wb") as f:
+        # Pretty-printed, since this is the template users fill in by hand
+        f.write(_dumps(initial, pretty=True))
+    _ENSURED.add(path)
+
+
+def migrate_secrets(path: str = DEFAULT_SECRETS_PATH) -> None:
+    """Create the secrets file, or add any missing band entries to it.
+    
+    Meant to be called once at CLI startup so that the read helpers never have to
+    write; the file is only rewritten when an entry is actually missing.
+    """
+    ensure_secrets_file(path)
+    with _write_lock(path):
+        secrets = load_secrets(path)
+        missing = [band_key for band_key in _BAND_KEYS[1:] if band_key not in secrets]
+        if not missing:
+            return
+        for band_key in missing:
+            secrets[band_key] = {"access_token": "", "refresh_token": ""}
+        save_secrets(secrets, path)
 
 
 def load_secrets(path: str = DEFAULT_SECRETS_PATH) -> Dict[str, Any]:
-    """Load the full secrets file."""
+    """Load the full secrets file.
+    
+    The file is only re-parsed when its mtime or size changes; otherwise a copy of the cached
+    data is returned, so callers are free to mutate the result before passing it to
+    save_secrets.
+    """
+    return copy.deepcopy(_cache_entry(path)[1])
+
+
+def _cached_view(path: str) -> Secrets:
+    """Get the typed view of the cached secrets; shared, so never mutate it."""
+    return _cache_entry(path)[2]
+
+
+def _cache_entry(path: str) -> Tuple[Tuple[int, int], Dict[str, Any], Secrets]:
+    """Get the cache entry for path, re-parsing the file if it changed."""
     ensure_secrets_file(path)
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    with _CACHE_LOCK:
+        try:
+            signature = _file_signature(path)
+        except FileNotFoundError:
+            # Deleted since it was first ensured; recreate the template
+            _ENSURED.discard(path)
+            ensure_secrets_file(path)
+            signature = _file_signature(path)
+        cached = _SECRETS_CACHE.get(path)
+        if cached is None or cached[0] != signature:
+            data = _read_secrets_file(path, signature[1])
+            cached = (signature, data, Secrets.from_json_obj(data))
+            _SECRETS_CACHE[path] = cached
+        return cached
 
 
-def save_secrets(data: Dict[str, Any], path: str = DEFAULT_SECRETS_PATH) -> None:
-    """Save the full secrets file."""
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+def save_secrets(
+    data: Dict[str, Any],
+    path: str = DEFAULT_SECRETS_PATH,
+    durable: bool = False,
+    *,
+    pretty: bool = False,
+) -> None:
+    """Save the full secrets file.
+    
+    The data is written to a temp file that then replaces secrets.json, so a crash
+    mid-write can never leave a truncated file behind. The temp file gets the
+    existing file's permissions (owner-only for a new file), and a symlinked
+    secrets.json is followed so the link itself survives.
+    
+    Args:
+        data: Full secrets dict to write
+        path: Path to secrets file
+        durable: If True, fsync before the swap so the new contents survive a power
+            loss; costs a disk flush, so only batched writes ask for it
+        pretty: If True, indent the JSON for reading by hand; token saves leave
+            this off and write compact JSON
+    """
+    target = os.path.realpath(path)
+    tmp_path = f"{target}.tmp.{os.getpid()}"
+    with _CACHE_LOCK:
+        try:
+            mode = os.stat(target).st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o600
+        try:
+            # Left behind by a killed process that had our pid
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        try:
+            with os.fdopen(os.open(tmp_path, _CREATE_FLAGS, mode), "wb") as f:
+                f.write(_dumps(data, pretty))
+                if durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        data = copy.deepcopy(data)
+        _SECRETS_CACHE[path] = (_file_signature(path), data, Secrets.from_json_obj(data))
+
+
+class SecretsWriter:
+    """Collect band token updates in memory and write secrets.json once.
+    
+    Use as a context manager; pending updates are flushed on exit, even when the
+    block raises. Queued tokens only exist in memory until then, so a process that
+    is killed mid-block loses them; the CLI saves rotated refresh tokens right away
+    instead, since a lost one means re-running the OAuth flow for that band.
+    """
+    
+    def __init__(self, path: str = DEFAULT_SECRETS_PATH) -> None:
+        self.path = path
+        self._pending: Dict[int, Tuple[str, str, Optional[float]]] = {}
+        self._lock = threading.Lock()
+    
+    def __enter__(self) -> "SecretsWriter":
+        return self
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        self.flush()
+    
+    def update_band(
+        self,
+        band_id: int,
+        access_token: str,
+        refresh_token: str,
+        expires_at: Optional[float] = None,
+    ) -> None:
+        """Queue new tokens for a band; same arguments as save_band_tokens."""
+        _band_key(band_id)
+        with self._lock:
+            self._pending[band_id] = (access_token, refresh_token, expires_at)
+    
+    def flush(self) -> None:
+        """Apply all queued updates with a single durable write."""
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+        save_band_tokens_bulk(pending, self.path, durable=True)
+
+
+def clear_secrets_cache() -> None:
+    """Forget cached secrets so the next load_secrets call re-reads the file."""
+    with _CACHE_LOCK:
+        _SECRETS_CACHE.clear()
+        _ENSURED.clear()
 
 
 def get_client_credentials(path: str = DEFAULT_SECRETS_PATH) -> Tuple[str, str]:
@@ -46,10 +365,15 @@ def get_client_credentials(path: str = DEFAULT_SECRETS_PATH) -> Tuple[str, str]:
     Returns:
         Tuple of (client_id, client_secret)
     """
-    secrets = load_secrets(path)
-    client_id = secrets.get("client_id") or ""
-    client_secret = secrets.get("client_secret") or ""
-    return client_id, client_secret
+    secrets = _cached_view(path)
+    return secrets.client_id, secrets.client_secret
+
+
+def _band_key(band_id: int) -> str:
+    """Validate a band_id and return its key in the secrets dict."""
+    if band_id not in VALID_BAND_IDS:
+        raise ValueError(f"band_id must be between 1 and {NUM_BANDS}, got {band_id}")
+    return _BAND_KEYS[band_id]
 
 
 def get_band_tokens(band_id: int, path: str = DEFAULT_SECRETS_PATH) -> Tuple[str, str]:
@@ -62,20 +386,24 @@ def get_band_tokens(band_id: int, path: str = DEFAULT_SECRETS_PATH) -> Tuple[str
     Returns:
         Tuple of (access_token, refresh_token)
     """
-    if not 1 <= band_id <= NUM_BANDS:
-        raise ValueError(f"band_id must be between 1 and {NUM_BANDS}, got {band_id}")
-    
-    secrets = load_secrets(path)
-    band_key = str(band_id)
+    # Read-only: a missing band entry reads as empty tokens (migrate_secrets adds it)
+    _band_key(band_id)
+    secrets = _cached_view(path)
+    return secrets.access[band_id], secrets.refresh[band_id]
+
+
+def get_band_token_expiry(band_id: int, path: str = DEFAULT_SECRETS_PATH) -> Optional[float]:
+    """Get when a band's access token should be refreshed.
     
-    if band_key not in secrets:
-        secrets[band_key] = {"access_token": "", "refresh_token": ""}
-        save_secrets(secrets, path)
+    Args:
+        band_id: Band number (1-10)
+        path: Path to secrets file
     
-    band_data = secrets.get(band_key, {})
-    access_token = band_data.get("access_token") or ""
-    refresh_token = band_data.get("refresh_token") or ""
-    return access_token, refresh_token
+    Returns:
+        Epoch seconds stored as access_token_expires_at, or None if unknown
+    """
+    _band_key(band_id)
+    return _cached_view(path).expires_at[band_id]
 
 
 def save_band_tokens(
@@ -83,6 +411,7 @@ def save_band_tokens(
     access_token: str,
     refresh_token: str,
     path: str = DEFAULT_SECRETS_PATH,
+    expires_at: Optional[float] = None,
 ) -> None:
     """Save access_token and refresh_token for a specific band.
     
@@ -91,16 +420,64 @@ def save_band_tokens(
         access_token: New access token
         refresh_token: New refresh token
         path: Path to secrets file
+        expires_at: Epoch seconds after which the access token should be refreshed;
+            None (or infinity) clears any stored expiry
     """
-    if not 1 <= band_id <= NUM_BANDS:
-        raise ValueError(f"band_id must be between 1 and {NUM_BANDS}, got {band_id}")
+    save_band_tokens_bulk({band_id: (access_token, refresh_token, expires_at)}, path)
+
+
+def save_band_tokens_bulk(
+    updates: Dict[int, Tuple[str, str, Optional[float]]],
+    path: str = DEFAULT_SECRETS_PATH,
+    durable: bool = False,
+) -> None:
+    """Save tokens for several bands with one read and one write of the secrets file.
+    
+    Args:
+        updates: Mapping of band_id to (access_token, refresh_token, expires_at), with
+            the same meaning as the save_band_tokens arguments
+        path: Path to secrets file
+        durable: Passed to save_secrets
+    """
+    band_updates = [(_band_key(band_id), tokens) for band_id, tokens in updates.items()]
     
-    secrets = load_secrets(path)
-    band_key = str(band_id)
+    with secrets_transaction(path, durable=durable) as secrets:
+        for band_key, (access_token, refresh_token, expires_at) in band_updates:
+            _apply_band_tokens(secrets, band_key, access_token, refresh_token, expires_at)
+
+
+@contextmanager
+def secrets_transaction(
+    path: str = DEFAULT_SECRETS_PATH,
+    durable: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """Load the secrets for modification and save them once the block completes.
     
-    if band_key not in secrets:
-        secrets[band_key] = {}
+    Other writers, in this process or another, wait until the transaction ends. If
+    the block raises, nothing is written.
     
-    secrets[band_key]["access_token"] = access_token
-    secrets[band_key]["refresh_token"] = refresh_token
-    save_secrets(secrets, path)
+    Example:
+        with secrets_transaction() as secrets:
+            secrets["1"]["access_token"] = "..."
+    """
+    with _write_lock(path):
+        secrets = load_secrets(path)
+        yield secrets
+        save_secrets(secrets, path, durable=durable)
+
+
+def _apply_band_tokens(
+    secrets: Dict[str, Any],
+    band_key: str,
+    access_token: str,
+    refresh_token: str,
+    expires_at: Optional[float],
+) -> None:
+    """Set one band's tokens (and expiry, if known) in a loaded secrets dict."""
+    band_data = secrets.setdefault(band_key, {})
+    band_data["access_token"] = access_token
+    band_data["refresh_token"] = refresh_token
+    if expires_at is not None and math.isfinite(expires_at):
+        band_data["access_token_expires_at"] = int(expires_at)
+    else:
+        band_data.pop("access_token_expires_at", None)
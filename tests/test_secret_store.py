@@ -0,0 +1,122 @@
+import json
+import multiprocessing
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+import secret_store  # noqa: E402
+
+
+@pytest.fixture
+def secrets_path(tmp_path):
+    path = str(tmp_path / "secrets.json")
+    secret_store.migrate_secrets(path)
+    yield path
+    secret_store.clear_secrets_cache()
+
+
+def _increment_counter(path, times):
+    for _ in range(times):
+        with secret_store.secrets_transaction(path) as secrets:
+            secrets["counter"] = secrets.get("counter", 0) + 1
+
+
+def test_nested_transaction_does_not_deadlock(secrets_path):
+    def nested_save():
+        with secret_store.secrets_transaction(secrets_path) as secrets:
+            secrets["client_id"] = "cid"
+            secret_store.save_band_tokens(2, "x", "y", path=secrets_path)
+
+    worker = threading.Thread(target=nested_save, daemon=True)
+    worker.start()
+    worker.join(timeout=5)
+    assert not worker.is_alive(), "nested secrets write deadlocked on the file lock"
+
+    secret_store.clear_secrets_cache()
+    assert secret_store.get_client_credentials(secrets_path) == ("cid", "")
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="needs fork"
+)
+def test_transactions_in_separate_processes_do_not_lose_updates(secrets_path):
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(target=_increment_counter, args=(secrets_path, 25)) for _ in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+        assert worker.exitcode == 0
+
+    secret_store.clear_secrets_cache()
+    assert secret_store.load_secrets(secrets_path)["counter"] == 100
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX permission bits")
+def test_save_keeps_file_permissions(secrets_path):
+    assert os.stat(secrets_path).st_mode & 0o777 == 0o600
+
+    os.chmod(secrets_path, 0o640)
+    secret_store.save_band_tokens(1, "access", "refresh", path=secrets_path)
+
+    assert os.stat(secrets_path).st_mode & 0o777 == 0o640
+
+
+@pytest.mark.skipif(os.name == "nt", reason="symlinks need privileges on Windows")
+def test_save_keeps_symlink(tmp_path):
+    target = tmp_path / "real.json"
+    link = tmp_path / "secrets.json"
+    secret_store.migrate_secrets(str(target))
+    os.symlink(target, link)
+
+    secret_store.save_band_tokens(1, "access", "refresh", path=str(link))
+
+    assert os.path.islink(link)
+    assert json.loads(target.read_text())["1"]["refresh_token"] == "refresh"
+    assert not [name for name in os.listdir(tmp_path) if ".tmp." in name]
+
+
+def test_external_rewrite_invalidates_cache(secrets_path):
+    assert secret_store.get_band_tokens(1, secrets_path) == ("", "")
+
+    secrets = secret_store.load_secrets(secrets_path)
+    secrets["1"] = {"access_token": "edited", "refresh_token": "by hand"}
+    with open(secrets_path, "w") as f:
+        json.dump(secrets, f)
+    # Make sure the signature changes even on filesystems with coarse mtimes
+    stat = os.stat(secrets_path)
+    os.utime(secrets_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert secret_store.get_band_tokens(1, secrets_path) == ("edited", "by hand")
+
+
+def test_secrets_writer_flushes_when_block_raises(secrets_path):
+    with pytest.raises(RuntimeError):
+        with secret_store.SecretsWriter(secrets_path) as writer:
+            writer.update_band(3, "access", "refresh", expires_at=1234.5)
+            raise RuntimeError("boom")
+
+    secret_store.clear_secrets_cache()
+    assert secret_store.get_band_tokens(3, secrets_path) == ("access", "refresh")
+    assert secret_store.get_band_token_expiry(3, secrets_path) == 1234.0
+
+
+def test_save_band_tokens_bulk_updates_only_given_bands(secrets_path):
+    secret_store.save_band_tokens(4, "old4", "keep4", path=secrets_path, expires_at=99.0)
+
+    secret_store.save_band_tokens_bulk(
+        {1: ("a1", "r1", None), 2: ("a2", "r2", 500.0)}, secrets_path
+    )
+
+    secret_store.clear_secrets_cache()
+    assert secret_store.get_band_tokens(1, secrets_path) == ("a1", "r1")
+    assert secret_store.get_band_token_expiry(1, secrets_path) is None
+    assert secret_store.get_band_token_expiry(2, secrets_path) == 500.0
+    assert secret_store.get_band_tokens(4, secrets_path) == ("old4", "keep4")
+    assert secret_store.get_band_token_expiry(4, secrets_path) == 99.0